@@ -1,32 +1,305 @@
-from flask import Flask, render_template
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context, make_response
 import sqlite3
 import datetime
+import time
+import json
+import base64
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
 
 app = Flask(__name__)
 DB_NAME = 'jarchive.db'
+SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 500
+# Bytes of rendered HTML collected before each chunk of a streamed page
+STREAM_BUFFER = 64 * 1024
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rendered responses kept per process, keyed by route + params + DB generation
+RESPONSE_CACHE_SIZE = 256
+
+# Orderings /api/clues can page through, each matching an index (id, the
+# INTEGER PRIMARY KEY, is the implicit last index column and makes every key
+# unique; unlike an implicit rowid, VACUUM never renumbers it). 'asc' flips
+# every direction, which SQLite serves by walking the same index backwards.
+CLUE_SORTS = {
+    'date': [('air_date', 'DESC'), ('episode', 'DESC'), ('order_num', 'ASC'), ('id', 'ASC')],
+    'value': [('dollar_amount', 'DESC'), ('id', 'DESC')],
+}
 
 def get_db_connection():
     conn = sqlite3.connect(DB_NAME)
     conn.row_factory = sqlite3.Row
+    # The scraper keeps the DB in WAL mode, so reads never wait on its writes
+    conn.execute('PRAGMA busy_timeout = 5000')
+    conn.execute('PRAGMA query_only = ON')
     return conn
 
+def get_generation(conn):
+    # Bumped by scraper.py on every committed write; 0 for a DB that predates it
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+class LRUCache:
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.items:
+                return None
+            self.items.move_to_end(key)
+            return self.items[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+response_cache = LRUCache(RESPONSE_CACHE_SIZE)
+cached_generation = None
+
+def cached_response(view):
+    # Serves repeat requests from response_cache until the scraper commits
+    # again, and answers If-None-Match with a 304 via a strong body-hash ETag
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        global cached_generation
+        if request.args.get('stream'):
+            return view(*args, **kwargs)
+
+        conn = get_db_connection()
+        generation = get_generation(conn)
+        conn.close()
+        if generation != cached_generation:
+            response_cache.clear()
+            cached_generation = generation
+
+        key = (request.path, tuple(sorted(request.args.items(multi=True))), generation)
+        entry = response_cache.get(key)
+        if entry is None:
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200:
+                return resp
+            body = resp.get_data()
+            entry = (body, resp.mimetype, hashlib.sha256(body).hexdigest()[:32])
+            response_cache.put(key, entry)
+
+        body, mimetype, etag = entry
+        resp = Response(body, mimetype=mimetype)
+        resp.set_etag(etag)
+        # Always revalidate; the ETag only changes when a scrape lands
+        resp.headers['Cache-Control'] = 'no-cache'
+        return resp.make_conditional(request)
+    return wrapper
+
+def format_date(air_date):
+    return datetime.datetime.fromtimestamp(air_date).strftime('%Y-%m-%d') if air_date else 'N/A'
+
+INDEX_SQL = 'SELECT * FROM clues ORDER BY air_date DESC, episode DESC, order_num ASC'
+
+def iter_clues(sql, params=()):
+    # Rows come straight off the cursor, one at a time; the connection is
+    # closed when the generator finishes or the client goes away
+    conn = get_db_connection()
+    try:
+        for clue in conn.execute(sql, params):
+            c = dict(clue)
+            c['formatted_date'] = format_date(c['air_date'])
+            yield c
+    finally:
+        conn.close()
+
+def stream_index():
+    # Template.generate() renders lazily as the clues iterator is consumed,
+    # so memory stays flat and the page head goes out before the first row
+    conn = get_db_connection()
+    total = conn.execute('SELECT COUNT(*) FROM clues').fetchone()[0]
+    conn.close()
+
+    context = {'clues': iter_clues(INDEX_SQL), 'total': total, 'server_rows': True}
+    app.update_template_context(context)
+    template = app.jinja_env.get_template('index.html')
+    return Response(stream_with_context(buffered(template.generate(context), STREAM_BUFFER)),
+                    mimetype='text/html')
+
+def buffered(chunks, size):
+    # Jinja yields a chunk per template statement; batch them so each write
+    # to the socket carries a useful amount of HTML
+    buf = []
+    buf_len = 0
+    for chunk in chunks:
+        buf.append(chunk)
+        buf_len += len(chunk)
+        if buf_len >= size:
+            yield ''.join(buf)
+            buf = []
+            buf_len = 0
+    if buf:
+        yield ''.join(buf)
+
 @app.route('/')
+@cached_response
 def index():
+    if request.args.get('stream'):
+        return stream_index()
+
+    # The script fetches the rows itself; the page only needs the count
     conn = get_db_connection()
-    clues = conn.execute('SELECT * FROM clues ORDER BY air_date DESC, episode DESC, order_number ASC').fetchall()
+    total = conn.execute('SELECT COUNT(*) FROM clues').fetchone()[0]
     conn.close()
-    
-    # Convert row objects to dicts and format date
-    clues_list = []
-    for clue in clues:
-        c = dict(clue)
-        if c['air_date']:
-            c['formatted_date'] = datetime.datetime.fromtimestamp(c['air_date']).strftime('%Y-%m-%d')
-        else:
-            c['formatted_date'] = 'N/A'
-        clues_list.append(c)
-
-    return render_template('index.html', clues=clues_list)
+
+    return render_template('index.html', clues=[], total=total)
+
+def fts_query(text):
+    # Quote every word so user input can't hit FTS5 query syntax; words are
+    # ANDed and the last one is a prefix match so partial typing still hits
+    words = [w.replace('"', '""') for w in text.split()]
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+
+def cursor_value_ok(value):
+    # Only what SQLite can bind: ints must fit in its 64-bit INTEGER
+    if isinstance(value, int):
+        return -2**63 <= value < 2**63
+    return value is None or isinstance(value, (str, float))
+
+def keyset_condition(keys, values):
+    # Rows strictly after `values` in the (column, direction) order, e.g. for
+    # (a DESC, b ASC): a < ? OR (a = ? AND b > ?). The leading a <= ? bound
+    # lets SQLite start the index scan at the cursor instead of filtering.
+    ops = {'ASC': '>', 'DESC': '<'}
+    clauses = []
+    params = []
+    for i, (column, direction) in enumerate(keys):
+        terms = [f'{col} = ?' for col, _ in keys[:i]] + [f'{column} {ops[direction]} ?']
+        clauses.append('(' + ' AND '.join(terms) + ')')
+        params.extend(values[:i + 1])
+    first_column, first_direction = keys[0]
+    bound = f'{first_column} {ops[first_direction]}= ?'
+    return f"{bound} AND ({' OR '.join(clauses)})", [values[0]] + params
+
+@app.route('/api/clues')
+@cached_response
+def api_clues():
+    args = request.args
+    sort = args.get('sort', 'date')
+    if sort not in CLUE_SORTS:
+        return jsonify({'error': f"sort must be one of {', '.join(CLUE_SORTS)}"}), 400
+    keys = CLUE_SORTS[sort]
+    if args.get('order') == 'asc':
+        keys = [(col, 'ASC' if d == 'DESC' else 'DESC') for col, d in keys]
+    limit = max(1, min(args.get('limit', PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+
+    where = []
+    params = []
+    if args.get('season'):
+        where.append('season = ?')
+        params.append(args['season'])
+    if args.get('episode'):
+        where.append('episode = ?')
+        params.append(args['episode'])
+    if args.get('round') in ('J', 'DJ'):
+        where.append('dj = ?')
+        params.append(args['round'] == 'DJ')
+    match = fts_query(args.get('q', ''))
+    if match:
+        where.append('id IN (SELECT rowid FROM clues_fts WHERE clues_fts MATCH ?)')
+        params.append(match)
+    if args.get('cursor'):
+        try:
+            values = decode_cursor(args['cursor'])
+        except ValueError:
+            return jsonify({'error': 'invalid cursor'}), 400
+        if not isinstance(values, list) or not all(map(cursor_value_ok, values)):
+            return jsonify({'error': 'invalid cursor'}), 400
+        if len(values) != len(keys):
+            return jsonify({'error': 'cursor does not match sort'}), 400
+        condition, cursor_params = keyset_condition(keys, values)
+        where.append(condition)
+        params.extend(cursor_params)
+
+    sql = 'SELECT * FROM clues'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY ' + ', '.join(f'{col} {d}' for col, d in keys) + ' LIMIT ?'
+    params.append(limit)
+
+    conn = get_db_connection()
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+
+    clues = []
+    for row in rows:
+        c = dict(row)
+        c['formatted_date'] = format_date(c['air_date'])
+        clues.append(c)
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor([rows[-1][col] for col, _ in keys])
+    return jsonify({'clues': clues, 'next_cursor': next_cursor})
+
+@app.route('/api/search')
+@cached_response
+def api_search():
+    start = time.perf_counter()
+    query = request.args.get('q', '')
+    match = fts_query(query)
+    if not match:
+        return jsonify({'error': "missing search text 'q'"}), 400
+    limit = max(1, min(request.args.get('limit', SEARCH_LIMIT, type=int), MAX_SEARCH_LIMIT))
+
+    sql = '''
+        SELECT c.uid, c.season, c.episode, c.air_date, c.category, c.dollar_value,
+               c.text, c.answer, c.contestant, c.dj, c.triple_stumper, clues_fts.rank AS rank
+        FROM clues_fts JOIN clues c ON c.id = clues_fts.rowid
+        WHERE clues_fts MATCH ?
+    '''
+    params = [match]
+    season = request.args.get('season')
+    if season:
+        sql += ' AND c.season = ?'
+        params.append(season)
+    sql += ' ORDER BY clues_fts.rank LIMIT ?'
+    params.append(limit)
+
+    conn = get_db_connection()
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+
+    results = []
+    for row in rows:
+        r = dict(row)
+        r['formatted_date'] = format_date(r['air_date'])
+        results.append(r)
+    return jsonify({
+        'query': query,
+        'results': results,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+    })
 
 if __name__ == '__main__':
     app.run(debug=True)
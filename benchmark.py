@@ -0,0 +1,193 @@
+import sys
+import os
+import io
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import datetime
+import platform
+import tracemalloc
+from contextlib import redirect_stdout
+
+from bs4 import BeautifulSoup
+
+import scraper
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test')
+
+# A stage counts as a regression when it gets this much slower than the baseline
+REGRESSION_THRESHOLD = 0.20
+
+def load_fixtures():
+    pages = []
+    for filename in sorted(os.listdir(FIXTURE_DIR)):
+        if filename.startswith('ep_') and filename.endswith('.htm'):
+            with open(os.path.join(FIXTURE_DIR, filename), 'rb') as f:
+                # Decode the same way download() does before caching
+                pages.append((filename, f.read().decode('utf-8', errors='replace')))
+    return pages
+
+def available_backends():
+    return [name for name in scraper.CLUE_EXTRACTORS if name != 'lxml' or scraper.lxml_html]
+
+def check_backends_agree(pages):
+    for filename, html in pages:
+        results = {name: scraper.CLUE_EXTRACTORS[name](html) for name in available_backends()}
+        reference = results.pop('bs4')
+        for name, clues in results.items():
+            if clues != reference:
+                print(f"MISMATCH: {name} and bs4 disagree on {filename}")
+                return False
+    return True
+
+def parse_page(backend, html):
+    if backend == 'lxml':
+        return scraper.lxml_html.document_fromstring(html)
+    return BeautifulSoup(html, 'html.parser')
+
+def extract_page(backend, tree):
+    if backend == 'lxml':
+        return scraper.clues_from_lxml_doc(tree)
+    return scraper.clues_from_soup(tree)
+
+def measure(fn, rounds, setup=None):
+    # Best-of-rounds wall time, then one extra run under tracemalloc for peak
+    # memory. tracemalloc only sees the Python heap, not libxml2's allocations.
+    # setup, if given, runs untimed before every call.
+    best = float('inf')
+    result = None
+    for _ in range(rounds):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+def bench_parse(pages, backend, rounds):
+    def run():
+        return [parse_page(backend, html) for _, html in pages]
+    seconds, peak, _ = measure(run, rounds)
+    return {'seconds': seconds, 'pages_per_sec': len(pages) / seconds, 'peak_bytes': peak}
+
+def bench_extract(pages, backend, rounds):
+    trees = [parse_page(backend, html) for _, html in pages]
+    def run():
+        return [clue for tree in trees for clue in extract_page(backend, tree) if clue]
+    seconds, peak, clues = measure(run, rounds)
+    return {
+        'seconds': seconds,
+        'pages_per_sec': len(pages) / seconds,
+        'clues': len(clues),
+        'clues_per_sec': len(clues) / seconds,
+        'peak_bytes': peak,
+    }
+
+def bench_write(pages, rounds):
+    # Writes every fixture episode through save_clues into a fresh scratch DB
+    # each round, so every round measures plain inserts rather than some
+    # rounds hitting the upsert path and its FTS update triggers
+    episodes = [
+        scraper.parse_episode_html(html, filename, 'bench', 0.0, backend='bs4')
+        for filename, html in pages
+    ]
+    clues = sum(len(episode) for episode in episodes)
+
+    workdir = tempfile.mkdtemp(prefix='jarchive-bench-')
+    saved_db_name = scraper.DB_NAME
+    scraper.close_db()
+    scraper.DB_NAME = os.path.join(workdir, 'bench.db')
+    try:
+        def fresh_db():
+            scraper.close_db()
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(scraper.DB_NAME + suffix):
+                    os.remove(scraper.DB_NAME + suffix)
+            with redirect_stdout(io.StringIO()):
+                scraper.init_db()
+        def run():
+            with redirect_stdout(io.StringIO()):
+                for episode in episodes:
+                    scraper.save_clues(episode)
+        seconds, peak, _ = measure(run, rounds, setup=fresh_db)
+    finally:
+        scraper.close_db()
+        scraper.DB_NAME = saved_db_name
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {'seconds': seconds, 'clues': clues, 'clues_per_sec': clues / seconds, 'peak_bytes': peak}
+
+def run_suite(rounds):
+    pages = load_fixtures()
+    results = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pages': len(pages),
+        'rounds': rounds,
+        'stages': {},
+    }
+    stages = results['stages']
+    for backend in available_backends():
+        stages[f'parse.{backend}'] = bench_parse(pages, backend, rounds)
+        stages[f'extract.{backend}'] = bench_extract(pages, backend, rounds)
+    stages['write.save_clues'] = bench_write(pages, rounds)
+    return results
+
+def print_results(results):
+    print(f"{results['pages']} fixture pages, best of {results['rounds']} rounds")
+    print(f"{'stage':<20}{'seconds':>10}{'pages/sec':>12}{'clues/sec':>12}{'py peak MB':>12}")
+    for name, stage in results['stages'].items():
+        pages_per_sec = f"{stage['pages_per_sec']:.1f}" if 'pages_per_sec' in stage else '-'
+        clues_per_sec = f"{stage['clues_per_sec']:.0f}" if 'clues_per_sec' in stage else '-'
+        print(f"{name:<20}{stage['seconds']:>10.4f}{pages_per_sec:>12}{clues_per_sec:>12}"
+              f"{stage['peak_bytes'] / 1e6:>12.2f}")
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    # Returns the stages that slowed down by more than threshold
+    regressions = []
+    print(f"\nCompared with {baseline['timestamp']}:")
+    for name, stage in results['stages'].items():
+        old = baseline['stages'].get(name)
+        if not old:
+            continue
+        change = stage['seconds'] / old['seconds'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<20}{change:>+10.1%}{flag}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parsing, extraction and DB writes on the test/ fixtures.")
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--output', help="save results as JSON to this path")
+    parser.add_argument('--compare', help="earlier JSON results to check for regressions")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="fractional slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    pages = load_fixtures()
+    if not check_backends_agree(pages):
+        sys.exit(1)
+
+    results = run_suite(args.rounds)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
@@ -4,13 +4,40 @@ import sqlite3
 import datetime
 import time
 import re
-import sys
 import os
 import hashlib
 import json
-import random
+import threading
+import asyncio
+import zlib
+import gzip
+import shutil
+import tempfile
+import unicodedata
+import argparse
+import multiprocessing
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
 from jinja2 import Environment, FileSystemLoader
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    from lxml import html as lxml_html, etree as lxml_etree
+except ImportError:
+    lxml_html = lxml_etree = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 # Configuration
 SEASONS_URL = 'http://www.j-archive.com/listseasons.php'
 BASE_URL = 'http://www.j-archive.com/'
@@ -18,16 +45,167 @@ DB_NAME = 'jarchive.db'
 CACHE_DIR = 'cache'
 DIST_DIR = 'dist'
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Page cache: 'sqlite' packs compressed pages into one blob table,
+# 'files' keeps the original one-html-file-per-URL layout
+CACHE_BACKEND = 'sqlite'
+CACHE_DB = os.path.join(CACHE_DIR, 'pages.sqlite')
+CACHE_COMPRESSION = 'zstd' if zstandard else 'gzip'
 
-def init_db():
-    conn = get_db_connection()
-    c = conn.cursor()
+# Season export layout: 1 = list of clue objects, 2 = dictionary-encoded columns
+EXPORT_FORMAT = 2
+# Season files are streamed to disk and compressed in chunks of this many characters
+EXPORT_CHUNK_SIZE = 256 * 1024
+# Format 2 columns are spooled to temp files every this many rows
+EXPORT_SPOOL_ROWS = 1000
+# Superseded export files stay on disk this long after the manifest stops
+# pointing at them, for open tabs still holding the old manifest
+EXPORT_RETAIN_SECONDS = 7 * 24 * 3600
+
+# Archive-wide search index in data/search/: clue records in blocks of
+# SEARCH_BLOCK_DOCS and postings cut into shards of about SEARCH_SHARD_BYTES.
+# The page fetches only the blocks and shards it needs, by byte range.
+SEARCH_INDEX_VERSION = 1
+SEARCH_BLOCK_DOCS = 32
+SEARCH_SHARD_BYTES = 64 * 1024
+SEARCH_MIN_TERM = 2
+# Every rebuild writes a full-size copy of the index, so superseded ones are
+# only kept long enough for in-flight searches; a page whose search fails
+# re-reads the manifest and retries on the current index
+SEARCH_RETAIN_SECONDS = 3600
+# Words too common to narrow a search; their postings would be the biggest shards
+SEARCH_STOPWORDS = frozenset('''
+    a an and are as at be by for from had has have he her his in is it its of on
+    or she that the their this to was were which who with
+'''.split())
+
+# Episode page parser: 'lxml' (C-backed, used when installed) or 'bs4'
+PARSER_BACKEND = 'lxml' if lxml_html else 'bs4'
+
+# How long a cached page is trusted before it is revalidated, by URL pattern
+# (first match wins, None = forever). Revalidation is a conditional GET, so
+# an unchanged page costs a 304 rather than a full download.
+CACHE_TTLS = [
+    (r'showgame\.php', 30 * 24 * 3600),
+    (r'showseason\.php', 3600),
+    (r'listseasons\.php', 3600),
+]
+DEFAULT_CACHE_TTL = 24 * 3600
+
+# Politeness budget shared by every thread that hits the network
+MAX_IN_FLIGHT = 4       # concurrent requests to j-archive
+REQUESTS_PER_SEC = 1.0  # sustained request rate across all threads
+REQUEST_BURST = 2       # requests allowed back-to-back after an idle spell
+FETCH_WORKERS = 4       # episode workers used by scrape_season
+PER_HOST_LIMIT = 4      # concurrent fetch_many requests per host
+FETCH_TIMEOUT = 30      # seconds, per request
+FETCH_RETRIES = 3       # extra attempts on connection errors, 429 and 5xx
+RETRY_BACKOFF = 2.0     # seconds before the first retry, doubled each time
+
+# PRAGMAs applied to every new connection. WAL lets app.py keep reading
+# while the scraper writes; NORMAL sync is durable enough under WAL.
+DB_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,         # ms to wait on a lock instead of failing
+    'cache_size': -64000,         # negative = KiB, so ~64MB of page cache
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+# Run a passive WAL checkpoint after this many committed transactions
+DB_CHECKPOINT_EVERY = 100
+# Size of sqlite3's per-connection prepared statement cache
+DB_STATEMENT_CACHE = 128
+
+BUMP_GENERATION_SQL = "UPDATE meta SET value = value + 1 WHERE key = 'generation'"
+
+class Database:
+    """One long-lived SQLite connection shared by every DB helper in a run.
+
+    Statements are reused from sqlite3's prepared statement cache as long as
+    callers pass the same SQL string, so helpers keep their SQL in constants.
+    """
+
+    def __init__(self, path=None, pragmas=None, cached_statements=None):
+        self.path = path or DB_NAME
+        self.pragmas = dict(DB_PRAGMAS if pragmas is None else pragmas)
+        self.cached_statements = cached_statements or DB_STATEMENT_CACHE
+        self.commits = 0
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, cached_statements=self.cached_statements)
+            self._conn.row_factory = sqlite3.Row
+            for name, value in self.pragmas.items():
+                self._conn.execute(f'PRAGMA {name} = {value}')
+        return self._conn
+
+    def execute(self, sql, params=()):
+        return self.conn.execute(sql, params)
+
+    def executemany(self, sql, rows):
+        return self.conn.executemany(sql, rows)
+
+    @contextmanager
+    def transaction(self, bump_generation=True):
+        # Commits on success, rolls back if the block raises. A transaction
+        # that changed rows also bumps the data generation, which app.py
+        # uses to know its cached responses are stale.
+        conn = self.conn
+        with conn:
+            changes = conn.total_changes
+            yield conn
+            if bump_generation and conn.total_changes != changes:
+                conn.execute(BUMP_GENERATION_SQL)
+        self.commits += 1
+        if DB_CHECKPOINT_EVERY and self.commits % DB_CHECKPOINT_EVERY == 0:
+            self.checkpoint()
+
+    def checkpoint(self, mode='PASSIVE'):
+        # PASSIVE never waits on readers, so app.py isn't stalled by it
+        return self.conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+
+    def optimize(self):
+        self.conn.execute('PRAGMA optimize')
+
+    def close(self):
+        if self._conn is not None:
+            if self.commits:
+                # End of a run that wrote: refresh planner stats, fold the WAL back in
+                self.optimize()
+                self.checkpoint('TRUNCATE')
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_db = None
+
+def get_db():
+    global _db
+    if _db is None:
+        _db = Database()
+    return _db
+
+def close_db():
+    global _db
+    if _db is not None:
+        _db.close()
+        _db = None
+
+def parse_int(text):
+    # "$1,200" -> 1200, "DD: $2,000" -> 2000, "18" -> 18; missing/blank -> 0
+    digits = re.sub(r'[^0-9]', '', text or '')
+    return int(digits) if digits else 0
+
+def migrate_create_clues(conn):
     # Create table with columns matching the dictionary keys
-    c.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS clues (
             uid TEXT PRIMARY KEY,
             episode TEXT,
@@ -44,57 +222,539 @@ def init_db():
             contestant TEXT
         )
     ''')
-    conn.commit()
-    conn.close()
+
+def migrate_numeric_columns_and_indexes(conn):
+    # Integer copies of the display strings so sorting isn't lexical, plus
+    # indexes for the season/episode lookups and the export/app sort order
+    conn.execute('ALTER TABLE clues ADD COLUMN dollar_amount INTEGER')
+    conn.execute('ALTER TABLE clues ADD COLUMN order_num INTEGER')
+    conn.create_function('parse_int', 1, parse_int, deterministic=True)
+    conn.execute('UPDATE clues SET dollar_amount = parse_int(dollar_value), order_num = parse_int(order_number)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_clues_season_episode ON clues (season, episode)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_clues_season_order ON clues (season, air_date DESC, episode DESC, order_num)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_clues_order ON clues (air_date DESC, episode DESC, order_num)')
+
+def migrate_search_index(conn):
+    create_search_index(conn, 'rowid')
+
+def create_search_index(conn, key):
+    # External-content FTS5 index over the searchable text, kept in sync by
+    # triggers and keyed on the clues column `key`. Writes must UPSERT rather
+    # than INSERT OR REPLACE: REPLACE's implicit delete doesn't fire the
+    # delete trigger.
+    conn.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS clues_fts USING fts5(
+            text, answer, category, contestant,
+            content='clues', content_rowid='{key}',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS clues_fts_insert AFTER INSERT ON clues BEGIN
+            INSERT INTO clues_fts (rowid, text, answer, category, contestant)
+            VALUES (new.{key}, new.text, new.answer, new.category, new.contestant);
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS clues_fts_delete AFTER DELETE ON clues BEGIN
+            INSERT INTO clues_fts (clues_fts, rowid, text, answer, category, contestant)
+            VALUES ('delete', old.{key}, old.text, old.answer, old.category, old.contestant);
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS clues_fts_update AFTER UPDATE ON clues BEGIN
+            INSERT INTO clues_fts (clues_fts, rowid, text, answer, category, contestant)
+            VALUES ('delete', old.{key}, old.text, old.answer, old.category, old.contestant);
+            INSERT INTO clues_fts (rowid, text, answer, category, contestant)
+            VALUES (new.{key}, new.text, new.answer, new.category, new.contestant);
+        END
+    ''')
+    rebuild_search_index(conn)
+
+def rebuild_search_index(conn):
+    # Re-derive the whole FTS index from the clues table in one bulk pass
+    conn.execute("INSERT INTO clues_fts (clues_fts) VALUES ('rebuild')")
+
+def migrate_value_indexes(conn):
+    # Backs app.py's sort=value keyset pagination, with and without a season
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_clues_value ON clues (dollar_amount)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_clues_season_value ON clues (season, dollar_amount)')
+
+def migrate_generation_counter(conn):
+    # Bumped once per committed write transaction (see Database.transaction)
+    conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)')
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 1)")
+
+def migrate_row_generations(conn):
+    # Each clue remembers the generation that last wrote it, so export_site
+    # can tell which seasons changed from (COUNT, MAX(generation)) alone
+    conn.execute('ALTER TABLE clues ADD COLUMN generation INTEGER NOT NULL DEFAULT 0')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_clues_season_generation ON clues (season, generation)')
+
+def migrate_clue_ids(conn):
+    # With uid as the primary key the rowid was implicit, and VACUUM may
+    # renumber implicit rowids, which would leave the FTS index and
+    # /api/clues cursors pointing at other rows. The table is rebuilt with an
+    # explicit INTEGER PRIMARY KEY, keeping every row's current rowid as its
+    # id, and the FTS index is re-keyed on it.
+    for trigger in ('clues_fts_insert', 'clues_fts_delete', 'clues_fts_update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    conn.execute('DROP TABLE IF EXISTS clues_fts')
+    conn.execute('''
+        CREATE TABLE clues_new (
+            id INTEGER PRIMARY KEY,
+            uid TEXT NOT NULL UNIQUE,
+            episode TEXT,
+            season TEXT,
+            air_date REAL,
+            category TEXT,
+            answer TEXT,
+            text TEXT,
+            dollar_value TEXT,
+            order_number TEXT,
+            dj BOOLEAN,
+            triple_stumper BOOLEAN,
+            clue_row TEXT,
+            contestant TEXT,
+            dollar_amount INTEGER,
+            order_num INTEGER,
+            generation INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    columns = ', '.join(CLUE_COLUMNS + ('generation',))
+    conn.execute(f'INSERT INTO clues_new (id, {columns}) SELECT rowid, {columns} FROM clues')
+    conn.execute('DROP TABLE clues')
+    conn.execute('ALTER TABLE clues_new RENAME TO clues')
+    # Dropped along with the old table
+    conn.execute('CREATE INDEX idx_clues_season_episode ON clues (season, episode)')
+    conn.execute('CREATE INDEX idx_clues_season_order ON clues (season, air_date DESC, episode DESC, order_num)')
+    conn.execute('CREATE INDEX idx_clues_order ON clues (air_date DESC, episode DESC, order_num)')
+    conn.execute('CREATE INDEX idx_clues_value ON clues (dollar_amount)')
+    conn.execute('CREATE INDEX idx_clues_season_value ON clues (season, dollar_amount)')
+    conn.execute('CREATE INDEX idx_clues_season_generation ON clues (season, generation)')
+    create_search_index(conn, 'id')
+
+# Applied in order; PRAGMA user_version records the last one that ran
+SCHEMA_MIGRATIONS = [
+    (1, migrate_create_clues),
+    (2, migrate_numeric_columns_and_indexes),
+    (3, migrate_search_index),
+    (4, migrate_value_indexes),
+    (5, migrate_generation_counter),
+    (6, migrate_row_generations),
+    (7, migrate_clue_ids),
+]
+
+def init_db():
+    db = get_db()
+    version = db.execute('PRAGMA user_version').fetchone()[0]
+    for target, migrate in SCHEMA_MIGRATIONS:
+        if version >= target:
+            continue
+        with db.transaction(bump_generation=False) as conn:
+            # DDL doesn't open a transaction by itself in sqlite3
+            conn.execute('BEGIN')
+            migrate(conn)
+            conn.execute(f'PRAGMA user_version = {target}')
+        version = target
+        print(f"Database schema migrated to version {target}")
+
+CLUE_COLUMNS = (
+    'uid', 'episode', 'season', 'air_date', 'category', 'answer', 'text',
+    'dollar_value', 'order_number', 'dj', 'triple_stumper', 'clue_row', 'contestant',
+    'dollar_amount', 'order_num'
+)
+
+# Rows are stamped with the current generation; the transaction bumps it on commit
+SAVE_CLUE_SQL = 'INSERT INTO clues ({}, generation) VALUES ({}, {}) ON CONFLICT (uid) DO UPDATE SET {}'.format(
+    ', '.join(CLUE_COLUMNS),
+    ', '.join(['?'] * len(CLUE_COLUMNS)),
+    "(SELECT value FROM meta WHERE key = 'generation')",
+    ', '.join(f'{col} = excluded.{col}' for col in CLUE_COLUMNS + ('generation',) if col != 'uid')
+)
+
+# Running totals so a season/backfill can report overall write throughput
+write_stats = {'rows': 0, 'seconds': 0.0}
+
+def save_clues(clues):
+    # Write a whole batch of clues with one executemany inside one transaction
+    if not clues:
+        return 0
+
+    rows = [clue_row(clue) for clue in clues]
+
+    start = time.perf_counter()
+    with get_db().transaction() as conn:
+        conn.executemany(SAVE_CLUE_SQL, rows)
+    elapsed = time.perf_counter() - start
+
+    write_stats['rows'] += len(rows)
+    write_stats['seconds'] += elapsed
+    rate = len(rows) / elapsed if elapsed > 0 else float('inf')
+    print(f"Saved {len(rows)} clues in {elapsed:.3f}s ({rate:.0f} rows/sec)")
+    return len(rows)
+
+def clue_row(clue):
+    values = dict(clue)
+    values.setdefault('dollar_amount', parse_int(clue.get('dollar_value')))
+    values.setdefault('order_num', parse_int(clue.get('order_number')))
+    return tuple(values.get(col) for col in CLUE_COLUMNS)
 
 def save_clue(clue_data):
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    # Prepare the INSERT OR REPLACE statement
-    columns = ', '.join(clue_data.keys())
-    placeholders = ', '.join(['?'] * len(clue_data))
-    sql = f'INSERT OR REPLACE INTO clues ({columns}) VALUES ({placeholders})'
-    
-    c.execute(sql, list(clue_data.values()))
-    conn.commit()
-    conn.close()
+    return save_clues([clue_data])
 
-def get_soup(url):
-    if not os.path.exists(CACHE_DIR):
-        os.makedirs(CACHE_DIR)
+def report_write_stats():
+    rows, seconds = write_stats['rows'], write_stats['seconds']
+    if rows == 0:
+        return
+    rate = rows / seconds if seconds > 0 else float('inf')
+    print(f"DB writes: {rows} clues in {seconds:.3f}s ({rate:.0f} rows/sec)")
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request may go out."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
 
+    def acquire(self):
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+rate_limiter = TokenBucket(REQUESTS_PER_SEC, REQUEST_BURST)
+in_flight = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    # One keep-alive session for the whole run, with a connection pool big
+    # enough for every in-flight request
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_IN_FLIGHT, pool_maxsize=MAX_IN_FLIGHT)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+def cache_key(url):
+    return hashlib.md5(url.encode('utf-8')).hexdigest()
+
+def cache_path(url):
     # Create a filename from the URL
-    filename = hashlib.md5(url.encode('utf-8')).hexdigest() + ".html"
-    filepath = os.path.join(CACHE_DIR, filename)
+    return os.path.join(CACHE_DIR, cache_key(url) + ".html")
 
-    if os.path.exists(filepath):
-        print(f"Loading from cache: {url}")
+def compress(data, method):
+    if method == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    if method == 'gzip':
+        return zlib.compress(data, 9)
+    return data
+
+def decompress(data, method):
+    if method == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Page was cached with zstd but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if method == 'gzip':
+        return zlib.decompress(data)
+    return data
+
+class FileCache:
+    """The original layout: cache/<md5 of url>.html, uncompressed.
+
+    There is nowhere to keep validators, so the file mtime is the fetch time
+    and stale pages are simply downloaded again.
+    """
+
+    def get(self, url):
+        entry = self.get_entry(url)
+        return entry['content'] if entry else None
+
+    def get_entry(self, url):
+        filepath = cache_path(url)
+        if not os.path.exists(filepath):
+            return None
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return {'content': content, 'fetched_at': os.path.getmtime(filepath), 'etag': None, 'last_modified': None}
+
+    def put(self, url, content, etag=None, last_modified=None):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(cache_path(url), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def touch(self, url):
+        os.utime(cache_path(url))
+
+    def close(self):
+        pass
+
+class SQLiteCache:
+    """Compressed pages packed into a single SQLite blob table.
+
+    Rows are keyed by the same md5 as the flat-file cache, so pages left over
+    from that layout are imported the first time they are looked up.
+    """
+
+    def __init__(self, path=None, compression=None):
+        self.path = path or CACHE_DB
+        self.compression = compression or CACHE_COMPRESSION
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS pages (
+                    key TEXT PRIMARY KEY,
+                    url TEXT,
+                    compression TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    body BLOB NOT NULL,
+                    fetched_at REAL,
+                    etag TEXT,
+                    last_modified TEXT
+                )
+            ''')
+            # Caches created before validators were stored
+            columns = {row[1] for row in self.conn.execute('PRAGMA table_info(pages)')}
+            for column in ('etag', 'last_modified'):
+                if column not in columns:
+                    self.conn.execute(f'ALTER TABLE pages ADD COLUMN {column} TEXT')
+
+    def get(self, url):
+        entry = self.get_entry(url)
+        return entry['content'] if entry else None
+
+    def get_entry(self, url):
+        key = cache_key(url)
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT compression, body, fetched_at, etag, last_modified FROM pages WHERE key = ?', (key,)
+            ).fetchone()
+        if row:
+            return {
+                'content': decompress(row[1], row[0]).decode('utf-8'),
+                'fetched_at': row[2] or 0,
+                'etag': row[3],
+                'last_modified': row[4],
+            }
+        legacy = FileCache().get_entry(url)
+        if legacy is not None:
+            # Imported once; left behind, the flat file would later be
+            # migrated over whatever newer copy SQLite has by then
+            self.put(url, legacy['content'], fetched_at=legacy['fetched_at'], replace=False)
+            os.remove(cache_path(url))
+        return legacy
+
+    def put(self, url, content, key=None, fetched_at=None, etag=None, last_modified=None, replace=True):
+        # Returns whether the page was stored; with replace=False an existing
+        # row for the key is kept as is
+        data = content.encode('utf-8')
+        body = compress(data, self.compression)
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                f'{verb} INTO pages (key, url, compression, size, body, fetched_at, etag, last_modified) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key or cache_key(url), url, self.compression, len(data), body, fetched_at or time.time(), etag, last_modified)
+            )
+        return cursor.rowcount > 0
+
+    def touch(self, url):
+        with self.lock, self.conn:
+            self.conn.execute('UPDATE pages SET fetched_at = ? WHERE key = ?', (time.time(), cache_key(url)))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+_cache = None
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = SQLiteCache() if CACHE_BACKEND == 'sqlite' else FileCache()
+    return _cache
+
+def close_cache():
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+
+def migrate_flat_cache(remove=True):
+    # Pack every cache/<md5>.html into the SQLite cache, then delete the files.
+    # Pages SQLite already has are newer than the flat copy and are kept.
+    cache = get_cache()
+    if not isinstance(cache, SQLiteCache):
+        print("CACHE_BACKEND is not 'sqlite'; nothing to migrate.")
+        return 0
+    if not os.path.isdir(CACHE_DIR):
+        return 0
+
+    files = sorted(f for f in os.listdir(CACHE_DIR) if f.endswith('.html'))
+    raw_bytes = 0
+    skipped = 0
+    for filename in files:
+        filepath = os.path.join(CACHE_DIR, filename)
         with open(filepath, 'r', encoding='utf-8') as f:
-            return BeautifulSoup(f.read(), 'html.parser')
+            content = f.read()
+        raw_bytes += os.path.getsize(filepath)
+        if not cache.put(None, content, key=filename[:-len('.html')], fetched_at=os.path.getmtime(filepath), replace=False):
+            skipped += 1
+
+    if remove:
+        for filename in files:
+            os.remove(os.path.join(CACHE_DIR, filename))
 
-    # Randomized delay between 0.2 and 2 seconds
-    delay = random.uniform(0.2, 2.0)
-    print(f"Waiting {delay:.2f}s before fetching {url}...")
-    time.sleep(delay)
+    packed_bytes = os.path.getsize(cache.path)
+    print(f"Migrated {len(files)} cached pages ({raw_bytes / 1e6:.1f} MB) into {cache.path} ({packed_bytes / 1e6:.1f} MB), "
+          f"{skipped} already there and kept")
+    return len(files)
+
+def cache_ttl(url):
+    for pattern, ttl in CACHE_TTLS:
+        if re.search(pattern, url):
+            return ttl
+    return DEFAULT_CACHE_TTL
+
+def read_cached(url):
+    # Returns (entry, fresh); a stale entry is still handed back so its
+    # validators can be used for a conditional request
+    entry = get_cache().get_entry(url)
+    if entry is None:
+        return None, False
+    ttl = cache_ttl(url)
+    fresh = ttl is None or time.time() - entry['fetched_at'] < ttl
+    if fresh:
+        print(f"Loading from cache: {url}")
+    return entry, fresh
+
+def download(url, entry=None):
+    # Network fetch under the politeness budget, retrying transient failures.
+    # With a stale cache entry this is a conditional GET.
+    headers = {}
+    if entry and entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry and entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+
+    session = get_session()
+    for attempt in range(FETCH_RETRIES + 1):
+        try:
+            with in_flight:
+                waited = rate_limiter.acquire()
+                if waited:
+                    print(f"Waited {waited:.2f}s before fetching {url}...")
+                print(f"Fetching {url}...")
+                resp = session.get(url, timeout=FETCH_TIMEOUT, headers=headers)
+            if resp.status_code == 429 or resp.status_code >= 500:
+                raise requests.HTTPError(f"{resp.status_code} Server Error", response=resp)
+            resp.raise_for_status()
+            break
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            status = e.response.status_code if e.response is not None else None
+            retryable = status is None or status == 429 or status >= 500
+            if not retryable or attempt == FETCH_RETRIES:
+                print(f"Error fetching {url}: {e}")
+                return stale_content(url, entry)
+            backoff = RETRY_BACKOFF * 2 ** attempt
+            print(f"Retrying {url} in {backoff:.1f}s ({e})")
+            time.sleep(backoff)
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            return stale_content(url, entry)
+
+    if resp.status_code == 304 and entry:
+        print(f"Not modified: {url}")
+        get_cache().touch(url)
+        return entry['content']
+
+    # Decode content to string for saving
+    content = resp.content.decode('utf-8', errors='replace')
+    get_cache().put(url, content, etag=resp.headers.get('ETag'), last_modified=resp.headers.get('Last-Modified'))
+    return content
+
+def stale_content(url, entry):
+    if entry is None:
+        return None
+    print(f"Using stale cached copy of {url}")
+    return entry['content']
+
+def fetch_page(url):
+    # Fresh cache hits never touch the politeness budget
+    entry, fresh = read_cached(url)
+    if fresh:
+        return entry['content']
+    return download(url, entry)
+
+async def fetch_many(urls, parse=None, on_result=None, workers=None):
+    """Fetch urls concurrently and return their results in order.
+
+    Blocking work (cache reads, downloads and the optional parse(url, html))
+    runs on a thread pool so parsing one page overlaps fetching the next.
+    on_result(url, result) is called on the event loop thread as each page
+    finishes, which keeps single-threaded consumers like the DB safe.
+    """
+    loop = asyncio.get_running_loop()
+    host_limits = {}
+    pool = ThreadPoolExecutor(max_workers=workers or FETCH_WORKERS)
+
+    async def fetch_one(url):
+        entry, fresh = await loop.run_in_executor(pool, read_cached, url)
+        if fresh:
+            content = entry['content']
+        else:
+            host = urlparse(url).netloc
+            limit = host_limits.setdefault(host, asyncio.Semaphore(PER_HOST_LIMIT))
+            async with limit:
+                content = await loop.run_in_executor(pool, download, url, entry)
+        result = content
+        if parse is not None and content is not None:
+            try:
+                result = await loop.run_in_executor(pool, parse, url, content)
+            except Exception as e:
+                print(f"Error parsing {url}: {e}")
+                result = None
+        if on_result is not None:
+            on_result(url, result)
+        return result
 
-    print(f"Fetching {url}...")
     try:
-        resp = requests.get(url)
-        resp.raise_for_status()
-        # Decode content to string for saving
-        content = resp.content.decode('utf-8', errors='replace')
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
-            
-        return BeautifulSoup(content, 'html.parser')
-    except Exception as e:
-        print(f"Error fetching {url}: {e}")
+        return await asyncio.gather(*(fetch_one(url) for url in urls))
+    finally:
+        pool.shutdown(wait=False)
+
+def fetch_pages(urls, parse=None, on_result=None, workers=None):
+    # Blocking wrapper around fetch_many for the synchronous scraper code
+    return asyncio.run(fetch_many(urls, parse, on_result, workers))
+
+def get_soup(url):
+    content = fetch_page(url)
+    if content is None:
         return None
+    return BeautifulSoup(content, 'html.parser')
 
 def get_seasons_list():
-    soup = get_soup(SEASONS_URL)
+    return parse_seasons_list(get_soup(SEASONS_URL))
+
+def parse_seasons_list(soup):
     if not soup: return []
 
     content = soup.find('div', {"id":"content"})
@@ -114,12 +774,10 @@ def get_seasons_list():
     return seasons
 
 def get_episodes_in_db(season_num):
-    conn = get_db_connection()
-    episodes = conn.execute('SELECT DISTINCT episode FROM clues WHERE season = ?', (season_num,)).fetchall()
-    conn.close()
+    episodes = get_db().execute('SELECT DISTINCT episode FROM clues WHERE season = ?', (season_num,)).fetchall()
     return [row['episode'] for row in episodes]
 
-def scrape_season(url, limit=None):
+def scrape_season(url, limit=None, workers=None):
     # Extract season number from URL (e.g., season=30)
     season_match = re.search(r'season=(\w+)', url)
     season_num = season_match.group(1) if season_match else "Unknown"
@@ -132,16 +790,26 @@ def scrape_season(url, limit=None):
     content = soup.find('div', {"id":"content"})
     if not content: return
     
-    episodes = content.find_all('a', {"href": re.compile(r'showgame\.php')})
-    
     # Get existing episodes to avoid re-scraping
     existing_episodes = get_episodes_in_db(season_num)
+    jobs = get_episode_jobs(content, season_num, skip=existing_episodes)
+    if limit is not None:
+        jobs = jobs[:limit]
+
+    new_episodes = scrape_episodes(jobs, workers)
     
-    count = 0
-    new_episodes = 0
+    if new_episodes == 0:
+        print(f"Season {season_num} is already up to date.")
+    else:
+        print(f"Finished scraping {new_episodes} new episodes for Season {season_num}.")
+        report_write_stats()
+
+def get_episode_jobs(content, season_num, skip=()):
+    # (href, episode, season, air_date) for every game linked from a season page
+    episodes = content.find_all('a', {"href": re.compile(r'showgame\.php')})
+
+    jobs = []
     for episode in episodes:
-        if limit is not None and count >= limit:
-            break
         text = episode.text.strip()
         ep_data = text.split(',')
         if len(ep_data) < 2:
@@ -151,7 +819,7 @@ def scrape_season(url, limit=None):
         match_ep = re.search(r'#(\d+)', ep_data[0])
         ep_num = match_ep.group(1) if match_ep else ep_data[0].strip()
 
-        if ep_num in existing_episodes:
+        if ep_num in skip:
             continue
 
         # air_date extraction
@@ -165,18 +833,47 @@ def scrape_season(url, limit=None):
                 
                 href = episode.get('href')
                 if href:
-                    scrape_episode(href, ep_num, season_num, timestamp)
-                    count += 1
-                    new_episodes += 1
+                    jobs.append((href, ep_num, season_num, timestamp))
             else:
                 print(f"Could not parse date from {date_str}")
         except Exception as e:
             print(f"Error parsing episode data for {text}: {e}")
-    
-    if new_episodes == 0:
-        print(f"Season {season_num} is already up to date.")
-    else:
-        print(f"Finished scraping {new_episodes} new episodes for Season {season_num}.")
+    return jobs
+
+def episode_url(url):
+    if not url.startswith('http'):
+        url = BASE_URL + url
+    return url
+
+def scrape_episodes(jobs, workers=None):
+    # Fetch and parse episodes through the async engine while the event loop
+    # thread does the DB writes, so parsing one page overlaps the network
+    # wait for the next. The politeness budget is enforced inside download().
+    workers = workers or FETCH_WORKERS
+    done = 0
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            try:
+                scrape_episode(*job)
+            except Exception as e:
+                print(f"Error scraping episode {job[1]}: {e}")
+                continue
+            done += 1
+        return done
+
+    meta = {episode_url(job[0]): job[1:] for job in jobs}
+
+    def parse(url, html):
+        return parse_episode_html(html, *meta[url])
+
+    def save(url, clues):
+        nonlocal done
+        if clues is not None:
+            save_clues(clues)
+        done += 1
+
+    fetch_pages(list(meta), parse=parse, on_result=save, workers=workers)
+    return done
 
 def run_incremental_scrape():
     print("Checking for next season to scrape...")
@@ -185,9 +882,7 @@ def run_incremental_scrape():
         print("Could not fetch seasons list.")
         return
 
-    conn = get_db_connection()
-    existing_seasons = [row['season'] for row in conn.execute('SELECT DISTINCT season FROM clues').fetchall()]
-    conn.close()
+    existing_seasons = [row['season'] for row in get_db().execute('SELECT DISTINCT season FROM clues').fetchall()]
     
     # Sort seasons by number (numeric if possible)
     def season_key(s):
@@ -232,20 +927,20 @@ def run_incremental_scrape():
         print("All seasons appear to be scraped and up to date!")
 
 def scrape_episode(url, episode_num, season_num, air_date):
-    if not url.startswith('http'):
-        url = BASE_URL + url
-        
-    soup = get_soup(url)
-    if not soup: return
+    clues = parse_episode(url, episode_num, season_num, air_date)
+    if clues is not None:
+        save_clues(clues)
 
-    allCategories = soup.find_all('td', {"class" : "category_name"})
-    cats = [] # List of categories without any html
-    for cat in allCategories:
-        cats.append(cat.get_text())
+def parse_episode(url, episode_num, season_num, air_date):
+    html = fetch_page(episode_url(url))
+    if html is None: return None
+    return parse_episode_html(html, episode_num, season_num, air_date)
 
-    allClues = soup.find_all(attrs={"class" : "clue"})
-    for clue in allClues:
-        clue_attribs = get_clue_attribs(clue, cats)
+def parse_episode_html(html, episode_num, season_num, air_date, backend=None):
+    extract = CLUE_EXTRACTORS[backend or PARSER_BACKEND]
+
+    episode_clues = []
+    for clue_attribs in extract(html):
         if clue_attribs:
             clue_attribs['air_date'] = air_date
             clue_attribs['episode'] = episode_num
@@ -253,8 +948,115 @@ def scrape_episode(url, episode_num, season_num, air_date):
 
             # Create a unique ID
             clue_attribs['uid'] = f"{episode_num}_{clue_attribs['category']}_{clue_attribs['dollar_value']}_{clue_attribs['order_number']}"
-            
-            save_clue(clue_attribs)
+            episode_clues.append(clue_attribs)
+
+    return episode_clues
+
+def extract_clues_bs4(html):
+    return clues_from_soup(BeautifulSoup(html, 'html.parser'))
+
+def clues_from_soup(soup):
+    allCategories = soup.find_all('td', {"class" : "category_name"})
+    cats = [] # List of categories without any html
+    for cat in allCategories:
+        cats.append(cat.get_text())
+
+    allClues = soup.find_all(attrs={"class" : "clue"})
+    return [get_clue_attribs(clue, cats) for clue in allClues]
+
+def extract_clues_lxml(html):
+    try:
+        doc = lxml_html.document_fromstring(html)
+    except (lxml_etree.ParserError, ValueError):
+        # Empty pages, and str pages with an XML encoding declaration, are
+        # rejected by lxml; bs4 returns no clues for them like before
+        return extract_clues_bs4(html)
+    return clues_from_lxml_doc(doc)
+
+def clues_from_lxml_doc(doc):
+    # One document-order walk over the board collects categories and every
+    # clue's fields together, instead of searching each clue subtree eight
+    # times. Each field keeps the first match inside its clue, exactly like
+    # the find() calls in get_clue_attribs.
+    cats = []
+    records = []
+    open_clues = []
+    for event, elem in lxml_etree.iterwalk(doc, events=('start', 'end')):
+        if not isinstance(elem.tag, str):
+            continue
+        if event == 'end':
+            if open_clues and open_clues[-1]['elem'] is elem:
+                open_clues.pop()
+            continue
+
+        classes = elem.get('class')
+        if not classes:
+            continue
+        classes = classes.split()
+
+        if 'clue' in classes:
+            record = {'elem': elem, 'wrong': []}
+            records.append(record)
+            open_clues.append(record)
+        if elem.tag == 'td' and 'category_name' in classes:
+            cats.append(elem.text_content())
+        if not open_clues:
+            continue
+
+        for record in open_clues:
+            if elem.tag == 'em' and 'correct_response' in classes:
+                record.setdefault('answer', elem)
+            if elem.tag == 'td' and 'right' in classes:
+                record.setdefault('right', elem)
+            if elem.tag == 'td' and 'wrong' in classes:
+                record['wrong'].append(elem)
+            if 'clue_unstuck' in classes:
+                record.setdefault('unstuck', elem)
+            if any('clue_value' in c for c in classes):
+                record.setdefault('value', elem)
+            if 'clue_text' in classes:
+                record.setdefault('text', elem)
+            if 'clue_order_number' in classes:
+                record.setdefault('order', elem)
+
+    return [build_clue_record(record, cats) for record in records]
+
+def build_clue_record(record, cats):
+    # Turns the elements collected by extract_clues_lxml into the same dict
+    # get_clue_attribs returns
+    try:
+        answer = record['answer'].text_content() if 'answer' in record else "Unknown"
+        contestant = record['right'].text_content() if 'right' in record else "None"
+
+        triple_stumper = False
+        for wa in record['wrong']:
+            if "Triple Stumper" in wa.text_content():
+                triple_stumper = True
+                contestant = "Triple Stumper"
+                break
+
+        if 'unstuck' not in record: return None
+        clue_id = record['unstuck'].get('id').split("_")[1:4]
+
+        cat_idx = int(clue_id[1]) - 1
+        if clue_id[0] == 'DJ':
+            cat_idx += 6
+        cat = cats[cat_idx] if cat_idx < len(cats) else "Unknown"
+
+        return {
+            "answer" : answer,
+            "category" : cat,
+            "text" : record['text'].text_content() if 'text' in record else "",
+            "dollar_value": record['value'].text_content() if 'value' in record else "0",
+            "order_number" : record['order'].text_content() if 'order' in record else "0",
+            "dj" : clue_id[0] == "DJ",
+            "triple_stumper" : triple_stumper,
+            "clue_row" : clue_id[2],
+            "contestant": contestant
+        }
+    except Exception as e:
+        print(f"Error parsing clue: {e}")
+        return None
 
 def get_clue_attribs(clue, cats):
     # Simplified extraction based on current HTML structure
@@ -324,80 +1126,553 @@ def get_clue_attribs(clue, cats):
         print(f"Error parsing clue: {e}")
         return None
 
-def export_site():
+def reparse_cached_episode(job):
+    # Runs in a worker process: parse one cached page, return plain tuples.
+    # Errors come back as a message instead of raising, since the pool would
+    # re-raise them in the parent and end the whole rebuild.
+    href, episode_num, season_num, air_date = job
+    try:
+        html = get_cache().get(episode_url(href))
+        if html is None:
+            return season_num, episode_num, None, None
+        clues = parse_episode_html(html, episode_num, season_num, air_date)
+    except Exception as e:
+        return season_num, episode_num, None, f"{type(e).__name__}: {e}"
+    if not clues:
+        # An empty or error page in the cache; replacing the episode with
+        # it would delete the clues already stored
+        return season_num, episode_num, None, "no clues on cached page"
+    return season_num, episode_num, [clue_row(clue) for clue in clues], None
+
+def replace_episode_clues(results):
+    # Single writer for reparse: each episode's rows are swapped wholesale so
+    # clues whose uid changed under the new parser don't linger
+    rows = [row for _, _, episode_rows in results for row in episode_rows]
+    start = time.perf_counter()
+    with get_db().transaction() as conn:
+        conn.executemany('DELETE FROM clues WHERE season = ? AND episode = ?',
+                         [(season, ep) for season, ep, _ in results])
+        conn.executemany(SAVE_CLUE_SQL, rows)
+    write_stats['rows'] += len(rows)
+    write_stats['seconds'] += time.perf_counter() - start
+
+def cached_episode_jobs():
+    # Rebuild the episode list from cached season pages only, never the network
+    cache = get_cache()
+    seasons = parse_seasons_list(BeautifulSoup(cache.get(SEASONS_URL) or '', 'html.parser'))
+    if not seasons:
+        seasons = [
+            {'number': row['season'], 'url': f"{BASE_URL}showseason.php?season={row['season']}"}
+            for row in get_db().execute('SELECT DISTINCT season FROM clues').fetchall()
+        ]
+
+    jobs = []
+    for s in seasons:
+        html = cache.get(s['url'])
+        if html is None:
+            print(f"Season {s['number']} page is not cached, skipping")
+            continue
+        content = BeautifulSoup(html, 'html.parser').find('div', {"id":"content"})
+        if content:
+            jobs.extend(get_episode_jobs(content, s['number']))
+    return jobs
+
+def reparse_cache(workers=None, batch_pages=50, progress_every=100):
+    jobs = cached_episode_jobs()
+    workers = workers or os.cpu_count() or 1
+    print(f"Re-parsing {len(jobs)} cached episodes with {workers} workers...")
+
+    # Workers open their own DB/cache handles; don't hand them ours across fork
+    close_db()
+    close_cache()
+
+    start = time.perf_counter()
+    done = missing = failed = clues = 0
+    batch = []
+    with multiprocessing.Pool(workers) as pool:
+        for season_num, episode_num, rows, error in pool.imap_unordered(reparse_cached_episode, jobs, chunksize=8):
+            done += 1
+            if error:
+                print(f"Error re-parsing episode {episode_num}: {error}")
+                failed += 1
+            elif rows is None:
+                missing += 1
+            else:
+                batch.append((season_num, episode_num, rows))
+                clues += len(rows)
+            if len(batch) >= batch_pages:
+                replace_episode_clues(batch)
+                batch = []
+            if done % progress_every == 0 or done == len(jobs):
+                elapsed = time.perf_counter() - start
+                print(f"  {done}/{len(jobs)} pages, {clues} clues ({done / elapsed:.1f} pages/sec)")
+    if batch:
+        replace_episode_clues(batch)
+
+    print(f"Re-parse complete: {done - missing - failed} episodes, {clues} clues, "
+          f"{missing} pages missing from cache, {failed} failed to parse")
+    report_write_stats()
+
+CLUE_EXTRACTORS = {
+    'bs4': extract_clues_bs4,
+    'lxml': extract_clues_lxml,
+}
+
+def write_atomic(path, data):
+    # Readers of dist/ see either the old file or the new one, never a partial write
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def write_if_changed(path, data):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == data:
+                return False
+    write_atomic(path, data)
+    return True
+
+class ExportStream:
+    """Write-only sink for one export file. Text is hashed, written to a temp
+    file and fed to the gzip/brotli compressors in chunks as it arrives, so a
+    season never has to sit in memory as a single string."""
+
+    def __init__(self, path, compress=True):
+        self.tmp_path = f"{path}.tmp{os.getpid()}"
+        self.hash = hashlib.sha256()
+        self.pending = []
+        self.pending_size = 0
+        self.file = open(self.tmp_path, 'wb')
+        self.files = [self.file]
+        self.suffixes = ['']
+        self.gz = self.br = None
+        if compress:
+            # .gz/.br siblings so the static host can serve them without compressing
+            # on the fly; mtime=0 keeps the gzip bytes stable across exports
+            self.gz_file = open(self.tmp_path + '.gz', 'wb')
+            self.gz = gzip.GzipFile(filename='', mode='wb', fileobj=self.gz_file, compresslevel=9, mtime=0)
+            self.files.append(self.gz_file)
+            self.suffixes.append('.gz')
+            if brotli:
+                self.br_file = open(self.tmp_path + '.br', 'wb')
+                self.br = brotli.Compressor(quality=11)
+                self.files.append(self.br_file)
+                self.suffixes.append('.br')
+
+    def write(self, text):
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= EXPORT_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        data = ''.join(self.pending).encode('utf-8')
+        self.pending = []
+        self.pending_size = 0
+        self.hash.update(data)
+        self.file.write(data)
+        if self.gz:
+            self.gz.write(data)
+        if self.br:
+            self.br_file.write(self.br.process(data))
+
+    def close(self):
+        self.flush()
+        if self.gz:
+            self.gz.close()
+        if self.br:
+            self.br_file.write(self.br.finish())
+        for f in self.files:
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        return self.hash.hexdigest()
+
+    def commit(self, path):
+        # Moves the finished temp files into place; returns their sizes
+        sizes = {}
+        for suffix, key in zip(self.suffixes, ('bytes', 'gzip_bytes', 'br_bytes')):
+            os.replace(self.tmp_path + suffix, path + suffix)
+            sizes[key] = os.path.getsize(path + suffix)
+        return sizes
+
+    def discard(self):
+        for f in self.files:
+            f.close()
+        for suffix in self.suffixes:
+            if os.path.exists(self.tmp_path + suffix):
+                os.remove(self.tmp_path + suffix)
+
+def remove_export_file(data_dir, filename):
+    for suffix in ('', '.gz', '.br'):
+        path = os.path.join(data_dir, filename + suffix)
+        if os.path.exists(path):
+            os.remove(path)
+
+def retire_export_file(manifest, filename):
+    # Queued for deletion once its retention period (see retention()) has passed
+    manifest.setdefault('retired', []).append([filename, time.time()])
+
+# Content-hashed export files, relative to the data dir
+EXPORT_FILE_RE = re.compile(r'(season_.+|search/(docs|postings|search))\.[0-9a-f]{16}\.json$')
+
+def retention(filename):
+    return SEARCH_RETAIN_SECONDS if filename.startswith('search/') else EXPORT_RETAIN_SECONDS
+
+def expired_export_files(manifest, data_dir):
+    # Splits off the retired files that are old enough to delete, leaving the
+    # rest queued. A file that is live again (same content hash) is dropped
+    # from the queue instead. Hashed files nothing knows about, left by an
+    # export that failed before writing its manifest, are queued too.
+    live = {entry['file'] for entry in manifest['seasons'].values()}
+    if 'search' in manifest:
+        live.update(manifest['search']['files'])
+    known = live | {filename for filename, _ in manifest.get('retired', [])}
+    search_dir = os.path.join(data_dir, 'search')
+    filenames = os.listdir(data_dir)
+    if os.path.isdir(search_dir):
+        filenames += [f'search/{name}' for name in os.listdir(search_dir)]
+    for filename in filenames:
+        if EXPORT_FILE_RE.match(filename) and filename not in known:
+            retire_export_file(manifest, filename)
+    expired = []
+    retired = []
+    for filename, retired_at in manifest.get('retired', []):
+        if filename in live:
+            continue
+        if time.time() - retired_at >= retention(filename):
+            expired.append(filename)
+        else:
+            retired.append([filename, retired_at])
+    manifest['retired'] = retired
+    return expired
+
+def load_export_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'seasons': {}}
+
+def season_episodes(db, s_num):
+    episodes = db.execute('SELECT DISTINCT episode, air_date FROM clues WHERE season = ? ORDER BY air_date DESC', (s_num,)).fetchall()
+    episodes_list = []
+    for ep in episodes:
+        e = dict(ep)
+        e['formatted_date'] = datetime.datetime.fromtimestamp(e['air_date']).strftime('%Y-%m-%d') if e['air_date'] else 'N/A'
+        episodes_list.append(e)
+    return episodes_list
+
+def write_season(out, db, s_num):
+    # Streams the season's JSON into out as the cursor yields rows. The
+    # output is byte-for-byte what json.dumps() of the whole season gave.
+    episodes_list = season_episodes(db, s_num)
+    if EXPORT_FORMAT == 2:
+        return write_season_columns(out, db, s_num, episodes_list)
+
+    out.write('{"episodes": %s, "clues": [' % json.dumps(episodes_list))
+    for i, clue in enumerate(db.execute(EXPORT_CLUES_SQL, (s_num,))):
+        c = dict(clue)
+        c['formatted_date'] = datetime.datetime.fromtimestamp(c['air_date']).strftime('%Y-%m-%d') if c['air_date'] else 'N/A'
+        out.write((', ' if i else '') + json.dumps(c))
+    out.write(']}')
+
+EXPORT_COLUMNS = (
+    'episode', 'category', 'value', 'dollar_amount', 'order_num', 'clue_row',
+    'dj', 'triple_stumper', 'text', 'answer', 'contestant'
+)
+
+def json_string(value):
+    return 'null' if value is None else json.encoder.encode_basestring_ascii(value)
+
+def write_season_columns(out, db, s_num, episodes_list):
+    # Format 2: one array per field instead of one object per clue. Repeated
+    # strings (episode, category, contestant, value) become indexes into
+    # lookup tables, and per-clue season/air_date/formatted_date are dropped
+    # since the episode table already carries them.
+    episode_ids = {e['episode']: i for i, e in enumerate(episodes_list)}
+    categories, contestants, values = {}, {}, {}
+
+    # The lookup tables are only complete after the last row, and they come
+    # first in the file, so each column is spooled to its own temp file and
+    # copied out once the cursor is done.
+    spools = [tempfile.TemporaryFile('w+', encoding='utf-8') for _ in EXPORT_COLUMNS]
+    pending = [[] for _ in EXPORT_COLUMNS]
+
+    def spool_pending(first):
+        for spool, column in zip(spools, pending):
+            spool.write(('' if first else ', ') + ', '.join(column))
+            column.clear()
+
+    try:
+        count = 0
+        for clue in db.execute(EXPORT_CLUES_SQL, (s_num,)):
+            # Already JSON-encoded: ints via str(), strings via the C escaper
+            # json.dumps() uses, minus its per-call overhead
+            row = (
+                str(episode_ids[clue['episode']]),
+                str(categories.setdefault(clue['category'], len(categories))),
+                str(values.setdefault(clue['dollar_value'], len(values))),
+                str(clue['dollar_amount'] or 0),
+                str(clue['order_num'] or 0),
+                str(parse_int(clue['clue_row'])),
+                '1' if clue['dj'] else '0',
+                '1' if clue['triple_stumper'] else '0',
+                json_string(clue['text']),
+                json_string(clue['answer']),
+                str(contestants.setdefault(clue['contestant'], len(contestants))),
+            )
+            for column, value in zip(pending, row):
+                column.append(value)
+            count += 1
+            if count % EXPORT_SPOOL_ROWS == 0:
+                spool_pending(count == EXPORT_SPOOL_ROWS)
+        if count % EXPORT_SPOOL_ROWS:
+            spool_pending(count < EXPORT_SPOOL_ROWS)
+
+        out.write('{"format": 2, "season": %s, "episodes": %s, "categories": %s, "contestants": %s, "values": %s' % (
+            json.dumps(s_num), json.dumps(episodes_list),
+            json.dumps(list(categories)), json.dumps(list(contestants)), json.dumps(list(values)),
+        ))
+        out.write(', "clues": {"count": %d' % count)
+        for name, spool in zip(EXPORT_COLUMNS, spools):
+            out.write(', "%s": [' % name)
+            spool.seek(0)
+            shutil.copyfileobj(spool, out, EXPORT_CHUNK_SIZE)
+            out.write(']')
+        out.write('}}')
+    finally:
+        for spool in spools:
+            spool.close()
+
+EXPORT_CLUES_SQL = 'SELECT {} FROM clues WHERE season = ? ORDER BY air_date DESC, episode DESC, order_num ASC'.format(
+    ', '.join(CLUE_COLUMNS)
+)
+
+def search_terms(text):
+    # Accents folded, non-ASCII dropped, lowercased alphanumeric runs. The
+    # page splits queries the same way, using the stopwords and minimum
+    # length from the index directory.
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii').lower()
+    return [t for t in re.findall(r'[a-z0-9]+', text) if len(t) >= SEARCH_MIN_TERM and t not in SEARCH_STOPWORDS]
+
+# Doc ids are positions in this order, so lower ids are newer clues
+SEARCH_DOCS_SQL = """
+    SELECT season, episode, category, dollar_value, text, answer, contestant, dj, triple_stumper
+    FROM clues ORDER BY air_date DESC, episode DESC, order_num ASC
+"""
+
+def write_search_docs(stream, db, postings):
+    # Streams every clue as a compact record into blocks of SEARCH_BLOCK_DOCS
+    # and fills postings (term -> ascending doc ids). Returns the byte length
+    # of each block; json.dumps escapes to ASCII, so characters are bytes.
+    blocks = []
+    block = []
+
+    def end_block():
+        text = '[' + ','.join(block) + ']'
+        stream.write(text)
+        blocks.append(len(text))
+        block.clear()
+
+    for doc_id, clue in enumerate(db.execute(SEARCH_DOCS_SQL)):
+        block.append(json.dumps([
+            clue['season'], clue['episode'], clue['category'], clue['dollar_value'],
+            clue['text'], clue['answer'], clue['contestant'],
+            1 if clue['dj'] else 0, 1 if clue['triple_stumper'] else 0,
+        ]))
+        if len(block) == SEARCH_BLOCK_DOCS:
+            end_block()
+        words = ' '.join(clue[field] or '' for field in ('text', 'answer', 'category', 'contestant'))
+        for term in set(search_terms(words)):
+            postings.setdefault(term, array('I')).append(doc_id)
+    if block:
+        end_block()
+    return blocks
+
+def write_search_postings(stream, postings):
+    # Terms in sorted order, each with its doc ids delta-encoded, cut into
+    # shards that are each a standalone JSON object. Returns
+    # [first term, byte offset, byte length] per shard.
+    shards = []
+    entries = []
+    size = offset = 0
+    for term in sorted(postings):
+        ids = postings.pop(term)
+        deltas = [ids[0]] + [b - a for a, b in zip(ids, ids[1:])]
+        entry = '%s:[%s]' % (json.dumps(term), ','.join(map(str, deltas)))
+        if entries and size + len(entry) > SEARCH_SHARD_BYTES:
+            text = '{' + ','.join(entries) + '}'
+            stream.write(text)
+            shards.append([first, offset, len(text)])
+            offset += len(text)
+            entries, size = [], 0
+        if not entries:
+            first = term
+        entries.append(entry)
+        size += len(entry) + 1
+    if entries:
+        text = '{' + ','.join(entries) + '}'
+        stream.write(text)
+        shards.append([first, offset, len(text)])
+    return shards
+
+def write_search_file(search_dir, name, write):
+    # Streams one index file through write(stream) and names it by content
+    # hash. No .gz/.br siblings: byte ranges have to address the plain file.
+    stream = ExportStream(os.path.join(search_dir, f'{name}.json'), compress=False)
+    try:
+        layout = write(stream)
+        content_hash = stream.close()[:16]
+    except BaseException:
+        stream.discard()
+        raise
+    filename = f'{name}.{content_hash}.json'
+    stream.commit(os.path.join(search_dir, filename))
+    return filename, layout
+
+def export_search_index(db, data_dir):
+    # Returns the manifest entry for a freshly written index
+    search_dir = os.path.join(data_dir, 'search')
+    os.makedirs(search_dir, exist_ok=True)
+    postings = {}
+    docs_file, blocks = write_search_file(search_dir, 'docs', lambda stream: write_search_docs(stream, db, postings))
+    postings_file, shards = write_search_file(search_dir, 'postings', lambda stream: write_search_postings(stream, postings))
+    directory = json.dumps({
+        'version': SEARCH_INDEX_VERSION,
+        'documents': docs_file,
+        'block_docs': SEARCH_BLOCK_DOCS,
+        'blocks': blocks,
+        'postings': postings_file,
+        'shards': shards,
+        'min_length': SEARCH_MIN_TERM,
+        'stopwords': sorted(SEARCH_STOPWORDS),
+    })
+    filename = 'search.%s.json' % hashlib.sha256(directory.encode('utf-8')).hexdigest()[:16]
+    write_atomic(os.path.join(search_dir, filename), directory)
+    files = [f'search/{name}' for name in (docs_file, postings_file, filename)]
+    return {'version': SEARCH_INDEX_VERSION, 'file': files[-1], 'files': files}
+
+def export_site(force=False):
     print(f"Exporting site to {DIST_DIR}...")
-    
-    if not os.path.exists(DIST_DIR):
-        os.makedirs(DIST_DIR)
-    
+
     data_dir = os.path.join(DIST_DIR, 'data')
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
-        
-    conn = get_db_connection()
-    
-    # 1. Export Seasons Metadata
-    seasons = conn.execute('SELECT DISTINCT season FROM clues ORDER BY season DESC').fetchall()
-    seasons_list = [dict(s) for s in seasons]
-    
-    with open(os.path.join(data_dir, 'seasons.json'), 'w', encoding='utf-8') as f:
-        json.dump(seasons_list, f)
-        
-    # 2. Export each season's data
-    for season in seasons_list:
-        s_num = season['season']
+    os.makedirs(data_dir, exist_ok=True)
+
+    db = get_db()
+    manifest_path = os.path.join(data_dir, 'manifest.json')
+    manifest = load_export_manifest(manifest_path)
+    if force or manifest.get('format') != EXPORT_FORMAT:
+        # Keep the old entries so their files get cleaned up on re-export
+        for entry in manifest['seasons'].values():
+            entry['watermark'] = None
+    manifest['format'] = EXPORT_FORMAT
+
+    # 1. A cheap change watermark per season
+    watermarks = {
+        row['season']: [row['clues'], row['generation']]
+        for row in db.execute('SELECT season, COUNT(*) AS clues, MAX(generation) AS generation FROM clues GROUP BY season')
+    }
+
+    # 2. Export only the seasons whose watermark moved since the last export.
+    # Files are named by content hash so they can be cached forever; the
+    # front-end finds the current name for each season in manifest.json.
+    exported = 0
+    for s_num, watermark in watermarks.items():
+        previous = manifest['seasons'].get(s_num)
+        if previous and previous['watermark'] == watermark and os.path.exists(os.path.join(data_dir, previous['file'])):
+            continue
+
         print(f"  Exporting Season {s_num}...")
-        
-        # Get episodes for this season
-        episodes = conn.execute('SELECT DISTINCT episode, air_date FROM clues WHERE season = ? ORDER BY air_date DESC', (s_num,)).fetchall()
-        episodes_list = []
-        for ep in episodes:
-            e = dict(ep)
-            e['formatted_date'] = datetime.datetime.fromtimestamp(e['air_date']).strftime('%Y-%m-%d') if e['air_date'] else 'N/A'
-            episodes_list.append(e)
-            
-        # Get all clues for this season
-        clues = conn.execute('SELECT * FROM clues WHERE season = ? ORDER BY air_date DESC, episode DESC, order_number ASC', (s_num,)).fetchall()
-        clues_list = []
-        for clue in clues:
-            c = dict(clue)
-            c['formatted_date'] = datetime.datetime.fromtimestamp(c['air_date']).strftime('%Y-%m-%d') if c['air_date'] else 'N/A'
-            clues_list.append(c)
-            
-        season_data = {
-            "episodes": episodes_list,
-            "clues": clues_list
-        }
-        
-        with open(os.path.join(data_dir, f'season_{s_num}.json'), 'w', encoding='utf-8') as f:
-            json.dump(season_data, f)
-            
-    conn.close()
+        stream = ExportStream(os.path.join(data_dir, f'season_{s_num}.json'))
+        try:
+            write_season(stream, db, s_num)
+            content_hash = stream.close()[:16]
+        except BaseException:
+            stream.discard()
+            raise
+        filename = f'season_{s_num}.{content_hash}.json'
+        entry = {'watermark': watermark, 'file': filename, 'hash': content_hash}
+        entry.update(stream.commit(os.path.join(data_dir, filename)))
+        if previous and previous['file'] != filename:
+            retire_export_file(manifest, previous['file'])
+        manifest['seasons'][s_num] = entry
+        exported += 1
+
+    # Seasons that no longer have any clues
+    for s_num in set(manifest['seasons']) - set(watermarks):
+        retire_export_file(manifest, manifest['seasons'].pop(s_num)['file'])
+
+    # 3. The archive-wide search index covers every season, so it is rebuilt
+    # whenever any season's watermark moved
+    search_watermark = [[s_num] + watermark for s_num, watermark in sorted(watermarks.items())]
+    previous = manifest.get('search')
+    if (force or not previous or previous['version'] != SEARCH_INDEX_VERSION
+            or previous['watermark'] != search_watermark
+            or not all(os.path.exists(os.path.join(data_dir, f)) for f in previous['files'])):
+        print("  Building archive search index...")
+        entry = export_search_index(db, data_dir)
+        entry['watermark'] = search_watermark
+        for filename in set(previous['files'] if previous else []) - set(entry['files']):
+            retire_export_file(manifest, filename)
+        manifest['search'] = entry
+
+    # Every new file is in place before the manifest points at it, and old
+    # files are only deleted once it no longer does
+    expired = expired_export_files(manifest, data_dir)
+    write_atomic(manifest_path, json.dumps(manifest, indent=1, sort_keys=True))
+    for filename in expired:
+        remove_export_file(data_dir, filename)
+
+    # The season list goes last: the page loads the first season it names,
+    # so every season in it must already have its file and manifest entry
+    seasons_list = [{'season': s_num} for s_num in sorted(watermarks, reverse=True)]
+    write_if_changed(os.path.join(data_dir, 'seasons.json'), json.dumps(seasons_list))
+    print(f"  {exported} of {len(watermarks)} seasons changed since the last export")
     
-    # 3. Generate index.html from template
+    # 4. Generate index.html from template
     file_loader = FileSystemLoader('templates')
     env = Environment(loader=file_loader)
     template = env.get_template('index.html')
     
     # We pass an empty list for clues/episodes because the JS will fetch them
     output = template.render(clues=[], episodes=[], is_static=False)
-    
-    with open(os.path.join(DIST_DIR, 'index.html'), 'w', encoding='utf-8') as f:
-        f.write(output)
+    write_if_changed(os.path.join(DIST_DIR, 'index.html'), output)
         
-    conn = get_db_connection()
-    total_clues = conn.execute('SELECT COUNT(*) FROM clues').fetchone()[0]
-    conn.close()
+    total_clues = db.execute('SELECT COUNT(*) FROM clues').fetchone()[0]
     print(f"Export complete! Site is in the '{DIST_DIR}' directory.")
     print(f"Database Status: {total_clues} total clues stored in {DB_NAME}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape J! Archive into jarchive.db and export the static site.")
+    parser.add_argument('--export', action='store_true', help="only export the static site from the DB")
+    parser.add_argument('--force', action='store_true', help="with --export, rewrite every season file")
+    parser.add_argument('--migrate-cache', action='store_true', help="pack the flat html cache into the SQLite cache")
+    parser.add_argument('--reparse-cache', action='store_true', help="rebuild the clues table from cached pages")
+    parser.add_argument('--workers', type=int, help="fetch threads, or processes with --reparse-cache")
+    args = parser.parse_args()
+
     init_db()
     
-    if len(sys.argv) > 1 and sys.argv[1] == "--export":
-        export_site()
-    else:
-        run_incremental_scrape()
+    try:
+        if args.export:
+            export_site(force=args.force)
+        elif args.migrate_cache:
+            migrate_flat_cache()
+        elif args.reparse_cache:
+            reparse_cache(args.workers)
+        else:
+            if args.workers:
+                FETCH_WORKERS = args.workers
+            run_incremental_scrape()
+    finally:
+        close_db()
+        close_cache()
 
 
 